@@ -322,17 +322,17 @@ class _ProfilePhotoIter(requestiter.RequestIter):
         result = await self.client(self.request)
 
         if isinstance(result, _tl.photos.Photos):
-            self.buffer = result.photos
+            self.buffer.extend(result.photos)
             self.left = len(self.buffer)
             self.total = len(self.buffer)
         elif isinstance(result, _tl.messages.Messages):
-            self.buffer = [x.action.photo for x in result.messages
-                           if isinstance(x.action, _tl.MessageActionChatEditPhoto)]
+            self.buffer.extend(x.action.photo for x in result.messages
+                               if isinstance(x.action, _tl.MessageActionChatEditPhoto))
 
             self.left = len(self.buffer)
             self.total = len(self.buffer)
         elif isinstance(result, _tl.photos.PhotosSlice):
-            self.buffer = result.photos
+            self.buffer.extend(result.photos)
             self.total = result.count
             if len(self.buffer) < self.request.limit:
                 self.left = len(self.buffer)
@@ -1,3 +1,5 @@
+import asyncio
+import datetime
 import inspect
 import itertools
 import time
@@ -5,13 +7,28 @@ import typing
 import warnings
 import dataclasses
 import os
+import sys
 
-from .._misc import helpers, utils, requestiter, hints
+from .._misc import helpers, utils, requestiter, hints, tlobject
 from ..types import _custom
 from ..types._custom.inputmessage import InputMessage
 from .. import errors, _tl
+from ..errors._custom import MultiError
+from ..errors._rpcbase import FloodError
 
 _MAX_CHUNK_SIZE = 100
+_LAST_ID_CACHE_SIZE = 100
+_LAST_ID_CACHE_TTL = 60
+
+# Generated types are never subclassed, so `type(x) is` can be used over `isinstance`
+_MSG_EMPTY = _tl.MessageEmpty
+_FILTER_EMPTY = _tl.InputMessagesFilterEmpty
+_SEARCH = _tl.fn.messages.Search
+_SEARCH_GLOBAL = _tl.fn.messages.SearchGlobal
+
+# Generated types are immutable, so stateless instances can be shared
+_INPUT_PEER_EMPTY = _tl.InputPeerEmpty()
+_INPUT_MESSAGES_FILTER_EMPTY = _tl.InputMessagesFilterEmpty()
 
 if typing.TYPE_CHECKING:
     from .telegramclient import TelegramClient
@@ -34,36 +51,42 @@ class _MessagesIter(requestiter.RequestIter):
             if self.reverse:
                 raise ValueError('Cannot reverse global search')
 
-        # Telegram doesn't like min_id/max_id. If these IDs are low enough
-        # (starting from last_id - 100), the request will return nothing.
-        #
-        # We can emulate their behaviour locally by setting offset = max_id
-        # and simply stopping once we hit a message with ID <= min_id.
-        if self.reverse:
-            offset_id = max(offset_id, min_id)
-            if offset_id and max_id:
-                if max_id - offset_id <= 1:
-                    raise StopAsyncIteration
+        # If no messages are wanted, only the total count needs to be fetched,
+        # which doesn't depend on the offsets.
+        count_only = self.limit <= 0
 
-            if not max_id:
-                max_id = float('inf')
-        else:
-            offset_id = max(offset_id, max_id)
-            if offset_id and min_id:
-                if offset_id - min_id <= 1:
-                    raise StopAsyncIteration
+        if not count_only:
+            # Telegram doesn't like min_id/max_id. If these IDs are low enough
+            # (starting from last_id - 100), the request will return nothing.
+            #
+            # We can emulate their behaviour locally by setting offset = max_id
+            # and simply stopping once we hit a message with ID <= min_id.
+            if self.reverse:
+                offset_id = max(offset_id, min_id)
+                if offset_id and max_id:
+                    if max_id - offset_id <= 1:
+                        raise StopAsyncIteration
 
-        if self.reverse:
-            if offset_id:
-                offset_id += 1
-            elif not offset_date:
-                # offset_id has priority over offset_date, so don't
-                # set offset_id to 1 if we want to offset by date.
-                offset_id = 1
+                if not max_id:
+                    max_id = sys.maxsize
+            else:
+                offset_id = max(offset_id, max_id)
+                if offset_id and min_id:
+                    if offset_id - min_id <= 1:
+                        raise StopAsyncIteration
+
+            if self.reverse:
+                if offset_id:
+                    offset_id += 1
+                elif not offset_date:
+                    # offset_id has priority over offset_date, so don't
+                    # set offset_id to 1 if we want to offset by date.
+                    offset_id = 1
 
         if from_user:
             from_user = await self.client._get_input_peer(from_user)
-            self.from_id = await self.client._get_peer_id(from_user)
+            # The input peer already has the ID, no need to go through _get_peer_id
+            self.from_id = utils.get_peer_id(_get_peer(self.client, from_user))
         else:
             self.from_id = None
 
@@ -71,10 +94,10 @@ class _MessagesIter(requestiter.RequestIter):
         # If we want to perform global a search with `from_user` we have to perform
         # a normal `messages.search`, *but* we can make the entity be `inputPeerEmpty`.
         if not self.entity and from_user:
-            self.entity = _tl.InputPeerEmpty()
+            self.entity = _INPUT_PEER_EMPTY
 
         if filter is None:
-            filter = _tl.InputMessagesFilterEmpty()
+            filter = _INPUT_MESSAGES_FILTER_EMPTY
         else:
             filter = filter() if isinstance(filter, type) else filter
 
@@ -85,7 +108,7 @@ class _MessagesIter(requestiter.RequestIter):
                 min_date=None,
                 max_date=offset_date,
                 offset_rate=0,
-                offset_peer=_tl.InputPeerEmpty(),
+                offset_peer=_INPUT_PEER_EMPTY,
                 offset_id=offset_id,
                 limit=1
             )
@@ -106,7 +129,7 @@ class _MessagesIter(requestiter.RequestIter):
                 min_id=0,
                 hash=0
             )
-        elif search is not None or not isinstance(filter, _tl.InputMessagesFilterEmpty) or from_user:
+        elif search is not None or type(filter) is not _FILTER_EMPTY or from_user:
             # Telegram completely ignores `from_id` in private chats
             ty = helpers._entity_type(self.entity)
             if ty == helpers._EntityType.USER:
@@ -140,11 +163,11 @@ class _MessagesIter(requestiter.RequestIter):
             #
             # Even better, using `filter` and `from_id` seems to always
             # trigger `RPC_CALL_FAIL` which is "internal issues"...
-            if not isinstance(filter, _tl.InputMessagesFilterEmpty) \
-                    and offset_date and not search and not offset_id:
-                async for m in self.client.get_messages(
-                        self.entity, 1, offset_date=offset_date):
-                    self.request = dataclasses.replace(self.request, offset_id=m.id + 1)
+            if type(filter) is not _FILTER_EMPTY \
+                    and offset_date and not search and not offset_id and not count_only:
+                last_id = await _get_last_id_before(self.client, self.entity, offset_date)
+                if last_id is not None:
+                    self.request = dataclasses.replace(self.request, offset_id=last_id + 1)
         else:
             self.request = _tl.fn.messages.GetHistory(
                 peer=self.entity,
@@ -157,7 +180,7 @@ class _MessagesIter(requestiter.RequestIter):
                 hash=0
             )
 
-        if self.limit <= 0:
+        if count_only:
             # No messages, but we still need to know the total message count
             result = await self.client(self.request)
             if isinstance(result, _tl.messages.MessagesNotModified):
@@ -175,9 +198,10 @@ class _MessagesIter(requestiter.RequestIter):
             self.request.add_offset -= _MAX_CHUNK_SIZE
 
         self.add_offset = add_offset
+        self._entities = {}
         self.max_id = max_id
         self.min_id = min_id
-        self.last_id = 0 if self.reverse else float('inf')
+        self.last_id = 0 if self.reverse else sys.maxsize
 
     async def _load_next_chunk(self):
         self.request = dataclasses.replace(self.request, limit=min(self.left, _MAX_CHUNK_SIZE))
@@ -188,24 +212,46 @@ class _MessagesIter(requestiter.RequestIter):
         r = await self.client(self.request)
         self.total = getattr(r, 'count', len(r.messages))
 
-        entities = {utils.get_peer_id(x): x
-                    for x in itertools.chain(r.users, r.chats)}
-
-        messages = reversed(r.messages) if self.reverse else r.messages
+        # Keep the entities seen in previous chunks, but prefer the newest ones
+        entities = self._entities
+        for user in r.users:
+            entities[user.id] = user
+        for chat in r.chats:
+            entities[utils.get_peer_id(chat)] = chat
+
+        # This loop runs for every message, so keep the lookups local
+        reverse = self.reverse
+        entity = self.entity
+        from_id = self.from_id
+        min_id = self.min_id
+        max_id = self.max_id
+        last_id = self.last_id
+        client = self.client
+        append = self.buffer.append
+        new_message = _custom.Message._new
+
+        # TL vectors are always deserialized into lists, so reversing is a lazy view (no copy)
+        messages = reversed(r.messages) if reverse else r.messages
         for message in messages:
-            if (isinstance(message, _tl.MessageEmpty)
-                    or self.from_id and message.sender_id != self.from_id):
+            if (type(message) is _MSG_EMPTY
+                    or from_id and message.sender_id != from_id):
                 continue
 
-            if not self._message_in_range(message):
-                return True
+            # Stop once the message is out of range (avoid loading more chunks).
+            # No entity means message IDs between chats may vary.
+            if entity:
+                if reverse:
+                    if message.id <= last_id or message.id >= max_id:
+                        return True
+                elif message.id >= last_id or message.id <= min_id:
+                    return True
 
             # There has been reports that on bad connections this method
             # was returning duplicated IDs sometimes. Using ``last_id``
             # is an attempt to avoid these duplicates, since the message
             # IDs are returned in descending order (or asc if reverse).
-            self.last_id = message.id
-            self.buffer.append(_custom.Message._new(self.client, message, entities, self.entity))
+            self.last_id = last_id = message.id
+            append(new_message(client, message, entities, entity))
 
         if len(r.messages) < self.request.limit:
             return True
@@ -223,22 +269,6 @@ class _MessagesIter(requestiter.RequestIter):
             # should just give up since there won't be any new Message.
             return True
 
-    def _message_in_range(self, message):
-        """
-        Determine whether the given message is in the range or
-        it should be ignored (and avoid loading more chunks).
-        """
-        # No entity means message IDs between chats may vary
-        if self.entity:
-            if self.reverse:
-                if message.id <= self.last_id or message.id >= self.max_id:
-                    return False
-            else:
-                if message.id >= self.last_id or message.id <= self.min_id:
-                    return False
-
-        return True
-
     def _update_offset(self, last_message, response):
         """
         After making the request, update its offset with the last message.
@@ -248,7 +278,7 @@ class _MessagesIter(requestiter.RequestIter):
             # We want to skip the one we already have
             self.request = dataclasses.replace(self.request, offset_id=self.request.offset_id + 1)
 
-        if isinstance(self.request, _tl.fn.messages.Search):
+        if type(self.request) is _SEARCH:
             # Unlike getHistory and searchGlobal that use *offset* date,
             # this is *max* date. This means that doing a search in reverse
             # will break it. Since it's not really needed once we're going
@@ -258,11 +288,11 @@ class _MessagesIter(requestiter.RequestIter):
             # getHistory, searchGlobal and getReplies call it offset_date
             self.request = dataclasses.replace(self.request, offset_date=last_message.date)
 
-        if isinstance(self.request, _tl.fn.messages.SearchGlobal):
+        if type(self.request) is _SEARCH_GLOBAL:
             if last_message.input_chat:
                 self.request = dataclasses.replace(self.request, offset_peer=last_message.input_chat)
             else:
-                self.request = dataclasses.replace(self.request, offset_peer=_tl.InputPeerEmpty())
+                self.request = dataclasses.replace(self.request, offset_peer=_INPUT_PEER_EMPTY)
 
             self.request = dataclasses.replace(self.request, offset_rate=getattr(response, 'next_rate', 0))
 
@@ -270,8 +300,7 @@ class _MessagesIter(requestiter.RequestIter):
 class _IDsIter(requestiter.RequestIter):
     async def _init(self, entity, ids):
         self.total = len(ids)
-        self._ids = list(reversed(ids)) if self.reverse else ids
-        self._offset = 0
+        self._ids = iter(reversed(ids) if self.reverse else ids)
         self._entity = (await self.client._get_input_peer(entity)) if entity else None
         self._ty = helpers._entity_type(self._entity) if self._entity else None
 
@@ -280,12 +309,10 @@ class _IDsIter(requestiter.RequestIter):
             self.wait_time = 10 if self.limit > 300 else 0
 
     async def _load_next_chunk(self):
-        ids = self._ids[self._offset:self._offset + _MAX_CHUNK_SIZE]
+        ids = list(itertools.islice(self._ids, _MAX_CHUNK_SIZE))
         if not ids:
             raise StopAsyncIteration
 
-        self._offset += _MAX_CHUNK_SIZE
-
         from_id = None  # By default, no need to validate from_id
         if self._ty == helpers._EntityType.CHANNEL:
             try:
@@ -297,10 +324,10 @@ class _IDsIter(requestiter.RequestIter):
         else:
             r = await self.client(_tl.fn.messages.GetMessages(ids))
             if self._entity:
-                from_id = await _get_peer(self.client, self._entity)
+                from_id = _get_peer(self.client, self._entity)
 
         if isinstance(r, _tl.messages.MessagesNotModified):
-            self.buffer.extend(None for _ in ids)
+            self.buffer.extend([None] * len(ids))
             return
 
         entities = {utils.get_peer_id(x): x
@@ -314,20 +341,164 @@ class _IDsIter(requestiter.RequestIter):
         # The passed message IDs may not belong to the desired entity
         # since the user can enter arbitrary numbers which can belong to
         # arbitrary chats. Validate these unless ``from_id is None``.
+        client = self.client
+        entity = self._entity
+        append = self.buffer.append
+        new_message = _custom.Message._new
         for message in r.messages:
-            if isinstance(message, _tl.MessageEmpty) or (
+            if type(message) is _MSG_EMPTY or (
                     from_id and message.peer_id != from_id):
-                self.buffer.append(None)
+                append(None)
+            else:
+                append(new_message(client, message, entities, entity))
+
+
+async def _get_last_id_before(self: 'TelegramClient', entity, offset_date):
+    """
+    Get the ID of the last message sent to entity before offset_date, or `None`.
+
+    Results are cached for a short while, because paginating over the same
+    date would otherwise need to repeat the same request every single time.
+    Only dates in the past are cached, since new messages can't appear before them.
+    """
+    key = (entity, offset_date)
+    now = time.time()
+    cached = self._last_id_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    last_id = None
+    async for m in self.get_messages(entity, 1, offset_date=offset_date):
+        last_id = m.id
+
+    if not _is_past(offset_date, now):
+        return last_id
+
+    # Re-inserting an expired key should move it to the end, not evict another
+    if self._last_id_cache.pop(key, None) is None \
+            and len(self._last_id_cache) >= _LAST_ID_CACHE_SIZE:
+        # Dictionaries are ordered, so this drops the oldest entry
+        del self._last_id_cache[next(iter(self._last_id_cache))]
+
+    self._last_id_cache[key] = (now + _LAST_ID_CACHE_TTL, last_id)
+    return last_id
+
+
+def _is_past(date, now):
+    # Relative dates (timedelta) move with time, so they're never considered past
+    if isinstance(date, datetime.datetime):
+        date = tlobject._datetime_to_timestamp(date)
+    elif isinstance(date, datetime.date):
+        date = tlobject._datetime_to_timestamp(datetime.datetime(date.year, date.month, date.day))
+    elif not isinstance(date, (int, float)):
+        return False
+
+    return date < now
+
+
+class _SendQueue:
+    """
+    Groups the requests sent to the same peer during the same event loop
+    iteration, so that they are invoked as a single container where each
+    request is wrapped in ``invokeAfterMsg`` of the previous one. Telegram
+    will still process them in order, but they only need one round-trip.
+    """
+    def __init__(self, client):
+        self._client = client
+        self._pending = {}  # peer -> [(request, future)]
+        self._flushes = set()  # asyncio only keeps weak references to tasks
+
+    def enqueue(self, peer, request):
+        """
+        Enqueue the request to be sent to the given peer, and return
+        a future that will be resolved with the result of the request.
+        """
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.get(peer)
+        if pending is None:
+            pending = self._pending[peer] = []
+            # The flush runs once everything already scheduled had a chance to enqueue
+            task = asyncio.ensure_future(self._flush(peer))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+        pending.append((request, future))
+        return future
+
+    async def _flush(self, peer):
+        pending = self._pending.pop(peer)
+        if len(pending) == 1:
+            # Nothing to pipeline, don't bother with containers
+            await self._invoke(*pending[0])
+            return
+
+        try:
+            results = await self._client([r for r, _ in pending], ordered=True)
+            exceptions = [None] * len(results)
+        except MultiError as e:
+            results = e.results
+            exceptions = e.exceptions
+        except BaseException as e:
+            for _, future in pending:
+                _set_exception(future, e)
+            return
+
+        retry = []  # [(request, future, delay)]
+        failed = False
+        for (request, future), result, exception in zip(pending, results, exceptions):
+            if exception is None:
+                _set_result(future, result)
+            elif failed:
+                # Each request is invoked after the previous one, so it may have
+                # failed only because an earlier one did. Try it on its own.
+                retry.append((request, future, 0))
             else:
-                self.buffer.append(_custom.Message._new(self.client, message, entities, self._entity))
+                failed = True
+                # Unlike single requests, list invokes don't sleep on flood waits
+                delay = max(exception.value or 0, 1) if isinstance(exception, FloodError) else None
+                if delay is not None and delay <= self._client.flood_sleep_threshold:
+                    retry.append((request, future, delay))
+                else:
+                    _set_exception(future, exception)
+
+        # Retried one by one (and in order) with the usual single-request handling
+        for request, future, delay in retry:
+            if delay:
+                self._client._log[__name__].info(
+                    'Sleeping for %ds on %s flood wait', delay, request.__class__.__name__)
+                await asyncio.sleep(delay)
+            await self._invoke(request, future)
+
+    async def _invoke(self, request, future):
+        try:
+            _set_result(future, await self._client(request))
+        except BaseException as e:
+            _set_exception(future, e)
+
+
+def _get_send_queue(self: 'TelegramClient'):
+    # Created on first use, since only sending messages needs it
+    if self._send_queue is None:
+        self._send_queue = _SendQueue(self)
+    return self._send_queue
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future, exception):
+    if not future.done():
+        future.set_exception(exception)
 
 
-async def _get_peer(self: 'TelegramClient', input_peer: 'hints.DialogLike'):
+def _get_peer(self: 'TelegramClient', input_peer: '_tl.TypeInputPeer'):
     try:
         return utils.get_peer(input_peer)
     except TypeError:
-        # Can only be self by now
-        return _tl.PeerUser(await self._get_peer_id(input_peer))
+        # Can only be self by now, whose ID is already known
+        return _tl.PeerUser(self._session_state.user_id)
 
 
 def get_messages(
@@ -494,24 +665,24 @@ async def send_message(
         request = _tl.fn.messages.SendMessage(
             peer=entity,
             message=message._text,
-            entities=formatting_entities,
+            entities=message._fmt_entities,
             no_webpage=not link_preview,
             reply_to_msg_id=utils.get_message_id(reply_to),
             clear_draft=clear_draft,
             silent=silent,
             background=background,
-            reply_markup=_custom.button.build_reply_markup(buttons),
+            reply_markup=message._reply_markup,
             schedule_date=schedule,
             noforwards=noforwards,
             send_as=send_as,
             random_id=int.from_bytes(os.urandom(8), 'big', signed=True),
         )
 
-    result = await self(request)
+    result = await _get_send_queue(self).enqueue(entity, request)
     if isinstance(result, _tl.UpdateShortSentMessage):
         return _custom.Message._new(self, _tl.Message(
             id=result.id,
-            peer_id=await _get_peer(self, entity),
+            peer_id=_get_peer(self, entity),
             message=message._text,
             date=result.date,
             out=result.out,
@@ -540,6 +711,10 @@ async def forward_messages(
     if as_album is not None:
         warnings.warn('the as_album argument is deprecated and no longer has any effect')
 
+    single = not utils.is_list_like(messages)
+    if single:
+        messages = (messages,)
+
     entity = await self._get_input_peer(dialog)
 
     if from_dialog:
@@ -555,21 +730,35 @@ async def forward_messages(
                 return from_peer_id
 
             raise ValueError('from_peer must be given if integer IDs are used')
-        elif isinstance(m, _tl.Message):
+        elif isinstance(m, _custom.Message):
             return m.chat_id
         else:
             raise TypeError('Cannot forward messages of type {}'.format(type(m)))
 
-    sent = []
-    for _chat_id, chunk in itertools.groupby(messages, key=get_key):
-        chunk = list(chunk)
+    groups = [(chat_id, list(chunk)) for chat_id, chunk in itertools.groupby(messages, key=get_key)]
+
+    # Several groups often belong to the same chat, so only resolve each chat once
+    input_chats = {}
+    if from_peer_id is not None:
+        input_chats[from_peer_id] = from_peer
+
+    unresolved = {}
+    for chat_id, chunk in groups:
+        if chat_id not in input_chats and not isinstance(chunk[0], int):
+            unresolved.setdefault(chat_id, chunk[0])
+
+    input_chats.update(zip(unresolved, await asyncio.gather(
+        *(m.get_input_chat() for m in unresolved.values()))))
+
+    requests = []
+    for chat_id, chunk in groups:
         if isinstance(chunk[0], int):
             chat = from_peer
         else:
-            chat = await chunk[0].get_input_chat()
+            chat = input_chats[chat_id]
             chunk = [m.id for m in chunk]
 
-        req = _tl.fn.messages.ForwardMessages(
+        requests.append(_tl.fn.messages.ForwardMessages(
             from_peer=chat,
             id=chunk,
             to_peer=entity,
@@ -580,8 +769,31 @@ async def forward_messages(
             noforwards=noforwards,
             send_as=send_as,
             random_id=[int.from_bytes(os.urandom(8), 'big', signed=True) for _ in chunk],
-        )
-        result = await self(req)
+        ))
+
+    # Forwards from the same chat must be kept in order,
+    # but those from different chats can be made concurrently.
+    indices_per_chat = {}
+    for i, (chat_id, _) in enumerate(groups):
+        indices_per_chat.setdefault(chat_id, []).append(i)
+
+    results = [None] * len(requests)
+
+    async def forward_from_chat(indices):
+        for i in indices:
+            results[i] = await self(requests[i])
+
+    tasks = [asyncio.ensure_future(forward_from_chat(indices)) for indices in indices_per_chat.values()]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Don't keep forwarding from the other chats in the background
+        for task in tasks:
+            task.cancel()
+        raise
+
+    sent = []
+    for req, result in zip(requests, results):
         sent.extend(self._get_response_message(req, result, entity))
 
     return sent[0] if single else sent
@@ -603,7 +815,8 @@ async def edit_message(
         supports_streaming: bool = False,
         schedule: 'hints.DateLike' = None
 ) -> '_tl.Message':
-    if formatting_entities is None:
+    # Without text there is nothing to parse (and it's left unchanged)
+    if formatting_entities is None and text:
         text, formatting_entities = await self._parse_message_text(text, parse_mode)
     file_handle, media, image = await self._file_to_media(file,
             supports_streaming=supports_streaming,
@@ -652,11 +865,11 @@ async def delete_messages(
         messages: 'typing.Union[typing.Sequence[hints.MessageIDLike]]',
         *,
         revoke: bool = True) -> 'typing.Sequence[_tl.messages.AffectedMessages]':
-    messages = (
+    messages = [
         m.id if isinstance(m, (
-            _tl.Message, _tl.MessageService, _tl.MessageEmpty))
+            _tl.Message, _tl.MessageService, _tl.MessageEmpty, _custom.Message))
         else int(m) for m in messages
-    )
+    ]
 
     if dialog:
         entity = await self._get_input_peer(dialog)
@@ -667,12 +880,14 @@ async def delete_messages(
         ty = helpers._EntityType.USER
 
     if ty == helpers._EntityType.CHANNEL:
-        res = await self([_tl.fn.channels.DeleteMessages(
-                entity, list(c)) for c in utils.chunks(messages)])
+        requests = [_tl.fn.channels.DeleteMessages(entity, list(c))
+                    for c in utils.chunks(messages, _MAX_CHUNK_SIZE)]
     else:
-        res = await self([_tl.fn.messages.DeleteMessages(
-            list(c), revoke) for c in utils.chunks(messages)])
+        requests = [_tl.fn.messages.DeleteMessages(list(c), revoke)
+                    for c in utils.chunks(messages, _MAX_CHUNK_SIZE)]
 
+    # All chunks go in a single invoke (the sender packs them into containers)
+    res = await self(requests)
     return sum(r.pts_count for r in res)
 
 async def mark_read(
@@ -143,6 +143,8 @@ def init(
     self._flood_waited_requests = {}  # prevent calls that would floodwait entirely
     self._phone_code_hash = None  # used during login to prevent exposing the hash to end users
     self._tos = None  # used during signup and when fetching tos (tos/expiry)
+    self._send_queue = None  # pipelines concurrent sends to the same peer, created on first send
+    self._last_id_cache = {}  # (peer, date) -> (expiry, message id), used when searching by date
 
     # Update handling.
     self._catch_up = catch_up
@@ -2299,6 +2299,13 @@ class TelegramClient:
             will fail with ``MessageIdInvalidError``. If only some are
             invalid, the list will have `None` instead of those messages.
 
+            Messages from different source chats are forwarded concurrently,
+            so they may arrive in the target chat in a different order than
+            given (messages from the same chat always keep their order). If
+            forwarding from one chat fails, the error is raised and forwards
+            from the other chats which didn't complete yet are cancelled, but
+            those that were already made are not undone.
+
         Example
             .. code-block:: python
 
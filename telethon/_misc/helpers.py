@@ -153,7 +153,16 @@ async def _cancel(log, **tasks):
                           '%s (%s)', name, type(task), task)
 
 
+# The entity type only depends on the class, so it's remembered once known
+_entity_types = {}
+
+
 def _entity_type(entity):
+    try:
+        return _entity_types[entity.__class__]
+    except KeyError:
+        pass
+
     # This could be a `utils` method that just ran a few `isinstance` on
     # `utils.get_peer(...)`'s result. However, there are *a lot* of auto
     # casts going on, plenty of calls and temporary short-lived objects.
@@ -177,16 +186,19 @@ def _entity_type(entity):
 
     name = entity.__class__.__name__
     if 'User' in name:
-        return _EntityType.USER
+        ty = _EntityType.USER
     elif 'Chat' in name:
-        return _EntityType.CHAT
+        ty = _EntityType.CHAT
     elif 'Channel' in name:
-        return _EntityType.CHANNEL
+        ty = _EntityType.CHANNEL
     elif 'Self' in name:
-        return _EntityType.USER
+        ty = _EntityType.USER
+    else:
+        # 'Empty' in name or not found, we don't care, not a valid entity.
+        raise TypeError('{} does not have any entity type'.format(entity))
 
-    # 'Empty' in name or not found, we don't care, not a valid entity.
-    raise TypeError('{} does not have any entity type'.format(entity))
+    _entity_types[entity.__class__] = ty
+    return ty
 
 
 def pretty_print(obj, indent=None, max_depth=float('inf')):
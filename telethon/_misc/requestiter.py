@@ -1,5 +1,6 @@
 import abc
 import asyncio
+import collections
 import time
 
 from . import helpers
@@ -22,6 +23,9 @@ class RequestIter(abc.ABC):
     Iterators may be used with ``reversed``, and their `reverse` flag will
     be set to `True` if that's the case. Note that if this flag is set,
     `buffer` should be filled in reverse too.
+
+    `buffer` is a `collections.deque` which is consumed from the left,
+    so subclasses should only ever add items to it (never rebind it).
     """
     def __init__(self, client, limit, *, reverse=False, wait_time=None, **kwargs):
         self.client = client
@@ -31,7 +35,6 @@ class RequestIter(abc.ABC):
         self.limit = max(float('inf') if limit is None or limit == () else limit, 0)
         self.left = self.limit
         self.buffer = None
-        self.index = 0
         self.total = None
         self.last_load = 0
         self.return_single = limit == 1 or limit == ()
@@ -52,14 +55,14 @@ class RequestIter(abc.ABC):
 
     async def __anext__(self):
         if self.buffer is None:
-            self.buffer = []
+            self.buffer = collections.deque()
             if await self._init(**self.kwargs):
                 self.left = len(self.buffer)
 
         if self.left <= 0:  # <= 0 because subclasses may change it
             raise StopAsyncIteration
 
-        if self.index == len(self.buffer):
+        if not self.buffer:
             # asyncio will handle times <= 0 to sleep 0 seconds
             if self.wait_time:
                 await asyncio.sleep(
@@ -67,22 +70,17 @@ class RequestIter(abc.ABC):
                 )
                 self.last_load = time.time()
 
-            self.index = 0
-            self.buffer = []
             if await self._load_next_chunk():
                 self.left = len(self.buffer)
 
         if not self.buffer:
             raise StopAsyncIteration
 
-        result = self.buffer[self.index]
         self.left -= 1
-        self.index += 1
-        return result
+        return self.buffer.popleft()
 
     def __aiter__(self):
         self.buffer = None
-        self.index = 0
         self.last_load = 0
         self.left = self.limit
         return self
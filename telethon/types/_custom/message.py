@@ -421,8 +421,6 @@ class Message(ChatGetter, SenderGetter):
 
     @classmethod
     def _new(cls, client, message, entities, input_chat):
-        self = cls.__new__(cls)
-
         sender_id = None
         if isinstance(message, _tl.Message):
             if message.from_id is not None:
@@ -1,8 +1,18 @@
+import asyncio
+import collections
+import datetime
 import inspect
+import logging
+import time
+import types
 
 import pytest
 
-from telethon import TelegramClient
+from telethon import TelegramClient, _tl
+from telethon.types import _custom
+from telethon._client import messages
+from telethon._client.messages import _SendQueue, _get_last_id_before
+from telethon.errors import MultiError, FloodError, _mk_error_type
 
 
 @pytest.mark.asyncio
@@ -38,3 +48,235 @@ async def test_send_message_with_file_forwards_args():
 
     client = MockedClient()
     assert (await client.send_message('a', file='b', **arguments)) == sentinel
+
+
+class _QueueClient:
+    """
+    Mocked client for `_SendQueue` where requests are ints, results are doubled
+    and the requests in `fail` fail with the given error when invoked as a list.
+    """
+    flood_sleep_threshold = 60
+
+    def __init__(self, fail=None):
+        self.calls = []
+        self.fail = fail or {}
+        self._log = collections.defaultdict(logging.getLogger)
+
+    async def __call__(self, request, ordered=False):
+        self.calls.append((request, ordered))
+        if not isinstance(request, list):
+            return request * 2
+
+        results = [None if r in self.fail else r * 2 for r in request]
+        exceptions = [self.fail.get(r) for r in request]
+        if any(exceptions):
+            # Mimic `invokeAfterMsg`, where everything after a failure fails too
+            first = next(i for i, e in enumerate(exceptions) if e)
+            for i in range(first + 1, len(request)):
+                results[i] = None
+                exceptions[i] = _mk_error_type(name='MSG_WAIT_FAILED', code=400)(400, 'MSG_WAIT_FAILED')
+            raise MultiError(exceptions, results, [_tl.fn.help.GetConfig()] * len(request))
+        return results
+
+
+@pytest.mark.asyncio
+async def test_send_queue_pipelines_same_peer():
+    client = _QueueClient()
+    queue = _SendQueue(client)
+    results = await asyncio.gather(
+        queue.enqueue('a', 1), queue.enqueue('a', 2), queue.enqueue('b', 3))
+
+    assert results == [2, 4, 6]
+    assert client.calls == [([1, 2], True), (3, False)]
+
+
+@pytest.mark.asyncio
+async def test_send_queue_retries_after_failed_request():
+    error = _mk_error_type(name='MESSAGE_TOO_LONG', code=400)(400, 'MESSAGE_TOO_LONG')
+    client = _QueueClient(fail={2: error})
+    queue = _SendQueue(client)
+    results = await asyncio.gather(
+        queue.enqueue('a', 1), queue.enqueue('a', 2), queue.enqueue('a', 3),
+        return_exceptions=True)
+
+    # The failed request is not retried, but those that depended on it are
+    assert results == [2, error, 6]
+    assert client.calls == [([1, 2, 3], True), (3, False)]
+
+
+@pytest.mark.asyncio
+async def test_send_queue_sleeps_on_flood_wait(monkeypatch):
+    slept = []
+
+    async def sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr(asyncio, 'sleep', sleep)
+
+    client = _QueueClient(fail={2: _mk_error_type(name='FLOOD_WAIT_1', code=420)(420, 'FLOOD_WAIT_1')})
+    queue = _SendQueue(client)
+    results = await asyncio.gather(
+        queue.enqueue('a', 1), queue.enqueue('a', 2), queue.enqueue('a', 3))
+
+    assert results == [2, 4, 6]
+    assert slept == [1]
+    assert client.calls == [([1, 2, 3], True), (2, False), (3, False)]
+
+
+@pytest.mark.asyncio
+async def test_send_queue_raises_long_flood_wait():
+    client = _QueueClient(fail={1: _mk_error_type(name='FLOOD_WAIT_120', code=420)(420, 'FLOOD_WAIT_120')})
+    queue = _SendQueue(client)
+    results = await asyncio.gather(
+        queue.enqueue('a', 1), queue.enqueue('a', 2), return_exceptions=True)
+
+    assert isinstance(results[0], FloodError)
+    assert results[1] == 4
+
+
+@pytest.mark.asyncio
+async def test_delete_messages_single_invoke():
+    from telethon._client.messages import delete_messages
+
+    calls = []
+
+    class MockedClient:
+        async def _get_input_peer(self, peer):
+            return _tl.InputPeerChat(1)
+
+        async def __call__(self, request):
+            calls.append(request)
+            return [_tl.messages.AffectedMessages(pts=1, pts_count=len(r.id)) for r in request]
+
+    assert await delete_messages(MockedClient(), 'chat', list(range(1, 1052))) == 1051
+    assert len(calls) == 1
+    assert [len(r.id) for r in calls[0]] == [100] * 10 + [51]
+
+
+class _LastIdClient:
+    """
+    Mocked client for `_get_last_id_before` where the last message ID before
+    a date is the date itself, and every lookup is recorded in `calls`.
+    """
+    def __init__(self):
+        self.calls = []
+        self._last_id_cache = {}
+
+    async def get_messages(self, entity, limit, *, offset_date):
+        self.calls.append((entity, offset_date))
+        yield types.SimpleNamespace(id=offset_date)
+
+
+@pytest.mark.asyncio
+async def test_last_id_before_cache_expires(monkeypatch):
+    now = 1000
+    monkeypatch.setattr(time, 'time', lambda: now)
+    client = _LastIdClient()
+
+    assert await _get_last_id_before(client, 'chat', 500) == 500
+    assert await _get_last_id_before(client, 'chat', 500) == 500
+    assert len(client.calls) == 1
+
+    now += 61
+    assert await _get_last_id_before(client, 'chat', 500) == 500
+    assert len(client.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_last_id_before_cache_drops_oldest(monkeypatch):
+    now = 1000
+    monkeypatch.setattr(time, 'time', lambda: now)
+    monkeypatch.setattr(messages, '_LAST_ID_CACHE_SIZE', 2)
+    client = _LastIdClient()
+
+    await _get_last_id_before(client, 'chat', 1)
+    await _get_last_id_before(client, 'chat', 2)
+    now += 61
+    # Refreshing an expired entry moves it to the end without evicting another
+    await _get_last_id_before(client, 'chat', 1)
+    assert list(client._last_id_cache) == [('chat', 2), ('chat', 1)]
+
+    await _get_last_id_before(client, 'chat', 3)
+    assert list(client._last_id_cache) == [('chat', 1), ('chat', 3)]
+
+
+@pytest.mark.asyncio
+async def test_last_id_before_does_not_cache_future_dates():
+    client = _LastIdClient()
+    future = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(hours=1)
+
+    await _get_last_id_before(client, 'chat', future)
+    await _get_last_id_before(client, 'chat', datetime.timedelta(hours=-1))
+    assert client._last_id_cache == {}
+
+
+class _ForwardClient:
+    """
+    Mocked client for `forward_messages` where forwarding takes as many
+    ticks as `delays` says for the source chat, or raises if it's an error.
+    """
+    def __init__(self, delays):
+        self.delays = delays
+        self.events = []
+
+    async def _get_input_peer(self, peer):
+        return peer
+
+    async def _get_peer_id(self, peer):
+        return peer
+
+    async def __call__(self, request):
+        chat = request.from_peer
+        self.events.append(('start', chat, request.id))
+        delay = self.delays[chat]
+        if isinstance(delay, Exception):
+            raise delay
+        for _ in range(delay):
+            await asyncio.sleep(0)
+        self.events.append(('end', chat, request.id))
+        return request
+
+    def _get_response_message(self, request, result, input_chat):
+        return [(request.from_peer, i) for i in request.id]
+
+
+def _forwardable(chat, message_id):
+    class ForwardableMessage(_custom.Message):
+        id = message_id
+        chat_id = chat
+
+        async def get_input_chat(self):
+            return chat
+
+    return ForwardableMessage.__new__(ForwardableMessage)
+
+
+@pytest.mark.asyncio
+async def test_forward_messages_keeps_order():
+    client = _ForwardClient({'a': 3, 'b': 0})
+    to_forward = [_forwardable('a', 1), _forwardable('b', 2), _forwardable('a', 3)]
+
+    sent = await messages.forward_messages(client, 'dest', to_forward)
+
+    # Results follow the input, even though the chats were forwarded concurrently
+    assert sent == [('a', 1), ('b', 2), ('a', 3)]
+    # Forwards from the same chat are not concurrent
+    a_events = [e for e in client.events if e[1] == 'a']
+    assert a_events == [('start', 'a', [1]), ('end', 'a', [1]), ('start', 'a', [3]), ('end', 'a', [3])]
+    # But those from different chats are
+    assert client.events.index(('end', 'b', [2])) < client.events.index(('end', 'a', [1]))
+
+
+@pytest.mark.asyncio
+async def test_forward_messages_cancels_other_chats_on_error():
+    client = _ForwardClient({'a': 100, 'b': ValueError('boom')})
+    to_forward = [_forwardable('a', 1), _forwardable('b', 2), _forwardable('a', 3)]
+
+    with pytest.raises(ValueError):
+        await messages.forward_messages(client, 'dest', to_forward)
+
+    for _ in range(200):
+        await asyncio.sleep(0)
+
+    assert ('end', 'a', [1]) not in client.events
+    assert ('start', 'a', [3]) not in client.events